@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 from typing import Any
 from app.core.security import (
@@ -21,19 +21,22 @@ router = APIRouter()
 @router.post("/register", response_model=BaseResponseModel[UserResponse], status_code=status.HTTP_201_CREATED)
 async def register(
     user_in: UserCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Register a new user."""
     try:
         # Check if user exists
-        if await UserService.get_user_by_email(db, user_in.email):
+        existing_users = await UserService.get_users_by_email_or_username(
+            db, user_in.email, user_in.username
+        )
+        if any(user.email == user_in.email for user in existing_users):
             return BaseResponseModel(
                 code=status.HTTP_400_BAD_REQUEST,
                 message="Email already registered",
                 errors={"email": "Email already registered"}
             )
         
-        if await UserService.get_user_by_username(db, user_in.username):
+        if existing_users:
             return BaseResponseModel(
                 code=status.HTTP_400_BAD_REQUEST,
                 message="Username already taken",
@@ -59,7 +62,7 @@ async def register(
 @router.post("/login", response_model=BaseResponseModel[TokenResponse])
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Login for access token."""
     try:
@@ -122,7 +125,7 @@ async def login(
 @router.post("/refresh", response_model=BaseResponseModel[TokenResponse])
 async def refresh_token(
     refresh_token: RefreshToken,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Get new access token using refresh token."""
     try:
@@ -270,7 +273,7 @@ async def verify_token_endpoint(request: Request) -> Any:
 @router.post("/logout", response_model=BaseResponseModel[str])
 async def logout(
     refresh_token: RefreshToken,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Logout user by revoking refresh token."""
     try:
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Any
 from app.models.user import User
 from app.schemas.base import BaseResponseModel
@@ -31,7 +31,7 @@ async def read_current_user(
 async def update_current_user(
     user_in: UserUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Update current user information."""
     # Check if email is being updated and already exists
@@ -65,7 +65,7 @@ async def read_users(
     skip: int = 0,
     limit: int = 100,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Get list of users."""
     users = await UserService.get_users(db, skip, limit)
@@ -80,7 +80,7 @@ async def read_users(
 async def read_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Get user by ID. Admin only."""
     user = await UserService.get_user(db, user_id)
@@ -102,7 +102,7 @@ async def update_user(
     user_id: int,
     user_in: UserUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Update user information. Admin only."""
     user = await UserService.get_user(db, user_id)
@@ -143,7 +143,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Delete user. Admin only."""
     user = await UserService.get_user(db, user_id)
@@ -174,7 +174,7 @@ async def delete_user(
 async def disable_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Disable user account. Admin only."""
     user = await UserService.get_user(db, user_id)
@@ -205,7 +205,7 @@ async def disable_user(
 async def enable_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Enable user account. Admin only."""
     user = await UserService.get_user(db, user_id)
@@ -9,6 +9,7 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 30)
     ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_CACHE_SIZE: int = int(os.getenv("ACCESS_TOKEN_CACHE_SIZE", 10000))
     
     # Database settings
     POSTGRES_USER: str = os.getenv("POSTGRES_USER", "postgres")
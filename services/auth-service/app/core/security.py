@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union
-from jose import jwt
+from typing import Any, Dict, Union
+from jose import jwk, jwt
 from passlib.context import CryptContext
 from app.core.config import settings
 from app.schemas.token import TokenPayload
@@ -8,6 +8,13 @@ import uuid
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Key objects built once so jose does not re-parse the secret on every encode/decode
+_ACCESS_TOKEN_KEY = jwk.construct(settings.JWT_SECRET_KEY, settings.ALGORITHM)
+_REFRESH_TOKEN_KEY = jwk.construct(settings.JWT_REFRESH_SECRET_KEY, settings.ALGORITHM)
+
+# Verified access token payloads (token -> payload); expiry is still checked on every hit
+_access_token_cache: Dict[str, TokenPayload] = {}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -38,18 +45,32 @@ def create_token(subject: Union[str, Any], token_type: str, expires_delta: timed
     
     encoded_jwt = jwt.encode(
         to_encode,
-        settings.JWT_SECRET_KEY if token_type == "access" else settings.JWT_REFRESH_SECRET_KEY,
+        _ACCESS_TOKEN_KEY if token_type == "access" else _REFRESH_TOKEN_KEY,
         algorithm=settings.ALGORITHM
     )
     
     return encoded_jwt
+def _cache_access_token(token: str, token_data: TokenPayload) -> None:
+    """Cache a verified access token payload, evicting the oldest entry when full."""
+    if len(_access_token_cache) >= settings.ACCESS_TOKEN_CACHE_SIZE:
+        _access_token_cache.pop(next(iter(_access_token_cache)))
+    _access_token_cache[token] = token_data
+
 def verify_token(token: str, token_type: str) -> TokenPayload:
     """Verify and decode a JWT token."""
     try:
         current_time = datetime.now(timezone.utc)
         
-        secret_key = settings.JWT_SECRET_KEY if token_type == "access" else settings.JWT_REFRESH_SECRET_KEY
-        payload = jwt.decode(token, secret_key, algorithms=[settings.ALGORITHM])
+        if token_type == "access":
+            cached = _access_token_cache.get(token)
+            if cached is not None:
+                if cached.exp < current_time:
+                    _access_token_cache.pop(token, None)
+                    raise jwt.JWTError("Token has expired")
+                return cached
+        
+        signing_key = _ACCESS_TOKEN_KEY if token_type == "access" else _REFRESH_TOKEN_KEY
+        payload = jwt.decode(token, signing_key, algorithms=[settings.ALGORITHM])
         
         if payload["type"] != token_type:
             raise jwt.JWTError("Invalid token type")
@@ -64,6 +85,9 @@ def verify_token(token: str, token_type: str) -> TokenPayload:
         
         if token_data.exp < current_time:
             raise jwt.JWTError("Token has expired")
+        
+        if token_type == "access":
+            _cache_access_token(token, token_data)
             
         return token_data
     except jwt.JWTError as e:
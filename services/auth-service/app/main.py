@@ -1,9 +1,14 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.core.config import settings
 from app.api.routes import router as api_router
 
-app = FastAPI(title="Auth Service", version="1.0.0")
+app = FastAPI(
+    title="Auth Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # CORS middleware configuration
 app.add_middleware(
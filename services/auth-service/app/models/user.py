@@ -35,4 +35,5 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    roles = relationship("Role", secondary=user_roles, back_populates="users")
+    # Eager-load roles: lazy loading is not available on an AsyncSession
+    roles = relationship("Role", secondary=user_roles, back_populates="users", lazy="selectin")
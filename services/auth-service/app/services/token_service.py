@@ -1,11 +1,12 @@
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.token import RefreshTokenDB, RevokedTokenDB
 from app.core.security import verify_token
 
 class TokenService:
     @staticmethod
-    async def store_refresh_token(db: Session, token: str, user_id: int) -> bool:
+    async def store_refresh_token(db: AsyncSession, token: str, user_id: int) -> bool:
         """Store refresh token in database."""
         try:
             payload = verify_token(token, "refresh")
@@ -15,30 +16,32 @@ class TokenService:
                 expires_at=payload.exp
             )
             db.add(refresh_token)
-            db.commit()
+            await db.commit()
             return True
         except Exception as e:
             import logging
             logging.error(f"Error storing refresh token: {str(e)}")
-            db.rollback()
+            await db.rollback()
             return False
 
     @staticmethod
-    async def verify_refresh_token(db: Session, token: str, user_id: int) -> bool:
+    async def verify_refresh_token(db: AsyncSession, token: str, user_id: int) -> bool:
         """Verify if refresh token exists and is valid."""
         try:
             # Check if token is revoked
-            revoked = db.query(RevokedTokenDB).filter(
-                RevokedTokenDB.jti == token
-            ).first()
+            revoked = await db.scalar(
+                select(RevokedTokenDB.id).where(RevokedTokenDB.jti == token).limit(1)
+            )
             if revoked:
                 return False
 
             # Check if token exists and belongs to user
-            stored_token = db.query(RefreshTokenDB).filter(
-                RefreshTokenDB.token == token,
-                RefreshTokenDB.user_id == user_id
-            ).first()
+            stored_token = await db.scalar(
+                select(RefreshTokenDB).where(
+                    RefreshTokenDB.token == token,
+                    RefreshTokenDB.user_id == user_id
+                ).limit(1)
+            )
             
             if not stored_token:
                 return False
@@ -56,7 +59,7 @@ class TokenService:
 
     @staticmethod
     async def revoke_refresh_token(
-        db: Session, 
+        db: AsyncSession, 
         token: str, 
         user_id: int, 
         reason: str = "Logout"
@@ -64,10 +67,12 @@ class TokenService:
         """Revoke a refresh token."""
         try:
             # Remove token from active refresh tokens
-            db.query(RefreshTokenDB).filter(
-                RefreshTokenDB.token == token,
-                RefreshTokenDB.user_id == user_id
-            ).delete()
+            await db.execute(
+                delete(RefreshTokenDB).where(
+                    RefreshTokenDB.token == token,
+                    RefreshTokenDB.user_id == user_id
+                )
+            )
 
             # Add token to revoked tokens
             revoked_token = RevokedTokenDB(
@@ -78,24 +83,24 @@ class TokenService:
             )
             
             db.add(revoked_token)
-            db.commit()
+            await db.commit()
             return True
         except Exception:
-            db.rollback()
+            await db.rollback()
             return False
 
     @staticmethod
     async def revoke_all_user_tokens(
-        db: Session, 
+        db: AsyncSession, 
         user_id: int, 
         reason: str = "Security measure"
     ) -> bool:
         """Revoke all refresh tokens for a user."""
         try:
             # Get all active refresh tokens for user
-            tokens = db.query(RefreshTokenDB).filter(
-                RefreshTokenDB.user_id == user_id
-            ).all()
+            tokens = (await db.scalars(
+                select(RefreshTokenDB).where(RefreshTokenDB.user_id == user_id)
+            )).all()
             
             for token in tokens:
                 await TokenService.revoke_refresh_token(
@@ -110,24 +115,24 @@ class TokenService:
             return False
 
     @staticmethod
-    async def cleanup_expired_tokens(db: Session) -> bool:
+    async def cleanup_expired_tokens(db: AsyncSession) -> bool:
         """Remove expired tokens from database."""
         try:
             current_time = datetime.utcnow()
             
             # Remove expired refresh tokens
-            db.query(RefreshTokenDB).filter(
-                RefreshTokenDB.expires_at < current_time
-            ).delete()
+            await db.execute(
+                delete(RefreshTokenDB).where(RefreshTokenDB.expires_at < current_time)
+            )
             
             # Remove expired revoked tokens (older than 30 days)
             thirty_days_ago = current_time.replace(day=current_time.day - 30)
-            db.query(RevokedTokenDB).filter(
-                RevokedTokenDB.revoked_at < thirty_days_ago
-            ).delete()
+            await db.execute(
+                delete(RevokedTokenDB).where(RevokedTokenDB.revoked_at < thirty_days_ago)
+            )
             
-            db.commit()
+            await db.commit()
             return True
         except Exception:
-            db.rollback()
+            await db.rollback()
             return False
\ No newline at end of file
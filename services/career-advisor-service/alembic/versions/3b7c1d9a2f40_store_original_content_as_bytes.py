@@ -0,0 +1,44 @@
+"""store original_content as bytes
+
+Revision ID: 3b7c1d9a2f40
+Revises: e66417bfa9d5
+Create Date: 2025-04-20 10:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7c1d9a2f40'
+down_revision: Union[str, None] = 'e66417bfa9d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'cv',
+        'original_content',
+        existing_type=sa.Text(),
+        type_=sa.LargeBinary(),
+        existing_nullable=True,
+        postgresql_using="convert_to(original_content, 'UTF8')",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Nội dung pdf/docx không phải UTF-8 nên không thể chuyển ngược về text
+    op.execute("UPDATE cv SET original_content = NULL WHERE file_type <> 'txt'")
+    op.alter_column(
+        'cv',
+        'original_content',
+        existing_type=sa.LargeBinary(),
+        type_=sa.Text(),
+        existing_nullable=True,
+        postgresql_using="convert_from(original_content, 'UTF8')",
+    )
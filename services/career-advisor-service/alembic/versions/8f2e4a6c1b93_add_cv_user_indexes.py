@@ -0,0 +1,28 @@
+"""add cv user indexes
+
+Revision ID: 8f2e4a6c1b93
+Revises: 3b7c1d9a2f40
+Create Date: 2025-04-20 11:03:47.502916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8f2e4a6c1b93'
+down_revision: Union[str, None] = '3b7c1d9a2f40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_cv_user_id_created_at', 'cv', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cv_user_id_created_at', table_name='cv')
\ No newline at end of file
@@ -1,16 +1,13 @@
 import json
-from typing import Dict, Any
+from typing import AsyncGenerator, Dict, Any
 from fastapi import Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import AsyncSessionLocal
 
-# Dependency để lấy DB session
-def get_db() -> Session:
-    try:
-        db = SessionLocal()
+# Dependency để lấy DB session (async)
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 async def get_current_user(
     request: Request
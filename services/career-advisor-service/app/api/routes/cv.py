@@ -1,7 +1,9 @@
 import asyncio
 import logging
 from fastapi import APIRouter, Depends, UploadFile, File, BackgroundTasks, status
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, load_only
 from typing import Any, Dict, List
 from datetime import datetime
 
@@ -14,11 +16,23 @@ from app.services.cv_processor import CVProcessor
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Các cột cần cho CVInDB, tránh tải extracted_text, embedding và các cột JSON phân tích
+CV_SUMMARY_COLUMNS = load_only(
+    CV.id,
+    CV.file_name,
+    CV.file_type,
+    CV.analysis_status,
+    CV.analysis_error,
+    CV.last_analyzed_at,
+    CV.created_at,
+    CV.updated_at,
+)
+
 
 @router.post("/upload", response_model=BaseResponseModel[CVInDB])
 async def upload_cv(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user),
     file: UploadFile = File(...)
 ) -> CVInDB:
@@ -27,7 +41,7 @@ async def upload_cv(
     """
     try:
         # Xử lý file CV
-        file_name, file_type, extracted_text = await CVProcessor.process_cv(file)
+        file_name, file_type, extracted_text, original_content = await CVProcessor.process_cv(file)
         if not file_name or not file_type or not extracted_text:
             return BaseResponseModel[CVInDB](
                 code=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -35,30 +49,21 @@ async def upload_cv(
                 errors="File name, type or extracted text is missing"
             )
 
-        # Lưu file content
-        await file.seek(0)
-        original_content = await file.read()
-
-        # Xử lý content cho text file
-        original_content_str = None
-        if file_type == 'txt':
-            original_content_str = original_content.decode(
-                'utf-8') if isinstance(original_content, bytes) else original_content
-
         # Tạo CV record
         user_id = current_user.get("id")
         cv = CV(
             user_id=user_id,
             file_name=file_name,
             file_type=file_type,
-            original_content=original_content_str,
+            original_content=original_content,
             extracted_text=extracted_text,
             analysis_status="pending"
         )
 
+        # expire_on_commit=False: id và timestamp đã có sau flush, không cần refresh
+        # (refresh sẽ tải lại cả nội dung file)
         db.add(cv)
-        db.commit()
-        db.refresh(cv)
+        await db.commit()
 
         return BaseResponseModel[CVInDB](
             code=status.HTTP_200_OK,
@@ -215,38 +220,54 @@ async def analyze_cv(
     *,
     cv_id: int,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user),
 ):
     """
     Analyze CV and store results in the database
     """
-    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id ==
-                             current_user.get("id")).first()
-    if not cv:
-        return BaseResponseModel(
-            code=status.HTTP_404_NOT_FOUND,
-            message="CV not found or does not belong to this user",
-            errors="CV not found or does not belong to this user"
+    owner_filter = (CV.id == cv_id, CV.user_id == current_user.get("id"))
+
+    # Chuyển trạng thái sang "processing" trong một câu UPDATE ... RETURNING:
+    # vừa kiểm tra quyền sở hữu, vừa tránh hai request cùng bắt đầu phân tích
+    claimed_id = await db.scalar(
+        update(CV)
+        .where(
+            *owner_filter,
+            or_(
+                CV.analysis_status.is_(None),
+                CV.analysis_status.notin_(("processing", "completed")),
+            ),
         )
+        .values(analysis_status="processing", last_analyzed_at=datetime.utcnow())
+        .returning(CV.id)
+    )
 
-    if cv.analysis_status == "processing":
-        return BaseResponseModel(
-            code=status.HTTP_400_BAD_REQUEST,
-            message="CV is already being analyzed",
-            data="CV is already being analyzed"
-        )
+    if claimed_id is None:
+        # Không claim được: CV không tồn tại hoặc đang/đã được phân tích
+        analysis_status = await db.scalar(select(CV.analysis_status).where(*owner_filter))
+
+        if analysis_status == "processing":
+            return BaseResponseModel(
+                code=status.HTTP_400_BAD_REQUEST,
+                message="CV is already being analyzed",
+                data="CV is already being analyzed"
+            )
+
+        if analysis_status == "completed":
+            return BaseResponseModel(
+                code=status.HTTP_200_OK,
+                message="CV analysis is already completed",
+                data="CV analysis is already completed"
+            )
 
-    if cv.analysis_status == "completed":
         return BaseResponseModel(
-            code=status.HTTP_200_OK,
-            message="CV analysis is already completed",
-            data="CV analysis is already completed"
+            code=status.HTTP_404_NOT_FOUND,
+            message="CV not found or does not belong to this user",
+            errors="CV not found or does not belong to this user"
         )
 
-    cv.analysis_status = "processing"
-    cv.last_analyzed_at = datetime.utcnow()
-    db.commit()
+    await db.commit()
     
     from concurrent.futures import ProcessPoolExecutor
     executor = ProcessPoolExecutor(max_workers=2)
@@ -264,14 +285,15 @@ async def analyze_cv(
 async def get_analysis(
     *,
     cv_id: int,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user)
 ):
     """
     Get CV analysis results
     """
-    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id ==
-                             current_user.get("id")).first()
+    cv = await db.scalar(
+        select(CV).where(CV.id == cv_id, CV.user_id == current_user.get("id"))
+    )
     if not cv:
         return BaseResponseModel(
             code=status.HTTP_404_NOT_FOUND,
@@ -355,8 +377,8 @@ async def get_analysis(
 
 
 @router.get("/list", response_model=BaseResponseModel[List[CVInDB]])
-def list_cvs(
-    db: Session = Depends(deps.get_db),
+async def list_cvs(
+    db: AsyncSession = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user),
     skip: int = 0,
     limit: int = 100
@@ -364,12 +386,14 @@ def list_cvs(
     """
     Get list of CVs for the current user
     """
-    list_cvs = (db.query(CV)
-                .filter(CV.user_id == current_user.get("id"))
-                .order_by(CV.created_at.desc())
-                .offset(skip)
-                .limit(limit)
-                .all())
+    list_cvs = (await db.scalars(
+        select(CV)
+        .options(CV_SUMMARY_COLUMNS)
+        .where(CV.user_id == current_user.get("id"))
+        .order_by(CV.created_at.desc())
+        .offset(skip)
+        .limit(limit)
+    )).all()
     if not list_cvs:
         return BaseResponseModel(
             code=status.HTTP_404_NOT_FOUND,
@@ -384,17 +408,20 @@ def list_cvs(
 
 
 @router.get("/{cv_id}", response_model=BaseResponseModel[CVInDB])
-def get_cv(
+async def get_cv(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_db),
     current_user: dict = Depends(deps.get_current_user),
     cv_id: int
 ) -> BaseResponseModel[CVInDB]:
     """
     Get CV by ID for the current user
     """
-    cv = db.query(CV).filter(CV.id == cv_id, CV.user_id ==
-                             current_user.get("id")).first()
+    cv = await db.scalar(
+        select(CV)
+        .options(CV_SUMMARY_COLUMNS)
+        .where(CV.id == cv_id, CV.user_id == current_user.get("id"))
+    )
     if not cv:
         return BaseResponseModel(
             code=status.HTTP_404_NOT_FOUND,
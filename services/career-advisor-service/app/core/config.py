@@ -56,6 +56,11 @@ class Settings(BaseSettings):
     SITE_URL: str = os.getenv("SITE_URL", "http://localhost:3000")
     SITE_NAME: str = os.getenv("SITE_NAME", "AI Career Advisor")
     AI_MODEL: str = os.getenv("AI_MODEL", "deepseek/deepseek-chat-v3-0324:free")
+    OPENAI_CONCURRENCY: int = int(os.getenv("OPENAI_CONCURRENCY", 5))
+    
+    # Embedding model configuration
+    EMBEDDING_MAX_SEQ_LENGTH: int = int(os.getenv("EMBEDDING_MAX_SEQ_LENGTH", 256))
+    EMBEDDING_USE_FP16: bool = os.getenv("EMBEDDING_USE_FP16", "true").lower() == "true"
     
     # Pinecone configuration
     PINECONE_API_KEY: str = os.getenv("PINECONE_API_KEY", "")
@@ -68,5 +73,7 @@ class Settings(BaseSettings):
     class Config:
         case_sensitive = True
         env_file = ".env"
+        frozen = True
+
 
 settings = Settings()
@@ -1,9 +1,18 @@
+import orjson
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
 
+
+def _json_serializer(obj) -> str:
+    """Serialize cột JSON bằng orjson (SQLAlchemy cần str, orjson trả về bytes)"""
+    return orjson.dumps(obj).decode()
+
+
 # Tạo engine cho SQLAlchemy
 engine = create_engine(
     settings.SQLALCHEMY_DATABASE_URI,
@@ -11,11 +20,31 @@ engine = create_engine(
     pool_size=5,         # Kích thước pool kết nối
     max_overflow=10,     # Số kết nối tối đa có thể vượt quá pool_size
     pool_recycle=3600,   # Recycle kết nối sau 1 giờ để tránh lỗi kết nối hết thời gian
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
 )
 
 # Tạo session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Engine async (asyncpg) cho các route để không chặn event loop khi truy vấn
+async_engine = create_async_engine(
+    make_url(settings.SQLALCHEMY_DATABASE_URI).set(drivername="postgresql+asyncpg"),
+    pool_pre_ping=True,
+    pool_size=20,
+    max_overflow=10,
+    pool_recycle=3600,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
+)
+
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Dependency để cung cấp database session cho mỗi request
 def get_db():
     db = SessionLocal()
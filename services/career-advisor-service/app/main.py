@@ -1,10 +1,15 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.openapi.utils import get_openapi
 from app.api.routes import router as api_router
 from app.core.config import settings
 from app.db.session import engine
 from app.db.base import Base
+from app.services.openai_service import close_client as close_openai_client
+from app.services.pinecone_service import PineconeClient
+from app.services.cv_processor import shutdown_extraction_pool
 from prometheus_client import make_asgi_app
 from contextlib import asynccontextmanager
 
@@ -17,10 +22,19 @@ async def lifespan(app: FastAPI):
     # Khởi tạo các kết nối, cơ sở dữ liệu, cache, v.v.
     print("Starting up the application...")
     
+    # Khởi tạo sẵn Pinecone index (list/create index + handshake) để request
+    # đầu tiên không phải chịu chi phí này
+    try:
+        await asyncio.to_thread(PineconeClient.get_instance)
+    except Exception as e:
+        print(f"Không thể khởi tạo Pinecone khi startup: {str(e)}")
+    
     yield
     
     # Dọn dẹp tài nguyên khi shutdown
     print("Shutting down the application...")
+    await close_openai_client()
+    shutdown_extraction_pool()
 
 
 # Tạo ứng dụng FastAPI
@@ -29,6 +43,7 @@ app = FastAPI(
     description="AI Career Advisor API Service - Cung cấp tư vấn nghề nghiệp AI",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Thiết lập CORS
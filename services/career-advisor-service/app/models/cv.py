@@ -1,14 +1,21 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, LargeBinary, Index
+from sqlalchemy.orm import deferred
 from app.db.base_class import Base
 
 class CV(Base):
+    # Index cho các truy vấn lọc theo chủ sở hữu (user_id) và liệt kê theo created_at
+    __table_args__ = (
+        Index("ix_cv_user_id_created_at", "user_id", "created_at"),
+    )
+
     # Thông tin về CV
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
     file_name = Column(String(255))
     file_type = Column(String(50))
-    original_content = Column(Text)
+    # Bytes gốc của file upload (pdf/docx/txt); deferred để các truy vấn CV không tải cả file
+    original_content = deferred(Column(LargeBinary))
     extracted_text = Column(Text)
     
     # Thông tin profile được trích xuất từ CV
@@ -1,3 +1,4 @@
+import io
 import os
 import json
 import logging
@@ -5,9 +6,9 @@ import PyPDF2
 import docx
 import asyncio
 from asyncio import TimeoutError, wait_for
+from concurrent.futures import ProcessPoolExecutor
 from typing import Tuple, Dict, Any, List, Optional
 from fastapi import UploadFile
-import tempfile
 from tenacity import retry, stop_after_attempt, wait_exponential
 
 from app.services.openai_service import (
@@ -17,11 +18,35 @@ from app.services.openai_service import (
     identify_skill_gaps,
 )
 from app.services.embedding_service import EmbeddingService
-from app.services.pinecone_service import search_career_pathways, store_career_pathway
+from app.services.pinecone_service import search_career_pathways, store_career_pathways_bulk
 
 # Cấu hình logger
 logger = logging.getLogger(__name__)
 
+# Số process tối đa dùng để trích xuất text từ PDF/DOCX
+EXTRACTION_MAX_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+
+# PDF có từ số trang này trở lên sẽ được trích xuất song song theo khoảng trang
+PARALLEL_PDF_MIN_PAGES = 8
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """Lấy process pool dùng chung cho việc trích xuất text, khởi tạo khi cần"""
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_MAX_WORKERS)
+    return _extraction_pool
+
+
+def shutdown_extraction_pool() -> None:
+    """Đóng process pool trích xuất text khi shutdown"""
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
 class CVProcessor:
     """Service để xử lý và phân tích CV"""
     
@@ -36,9 +61,10 @@ class CVProcessor:
     }
     
     @staticmethod
-    async def process_cv(file: UploadFile) -> Tuple[str, str, str]:
+    async def process_cv(file: UploadFile) -> Tuple[str, str, str, bytes]:
         """
-        Xử lý file CV và trả về tuple gồm (file_name, file_type, extracted_text)
+        Xử lý file CV và trả về tuple gồm (file_name, file_type, extracted_text, content)
+        với content là bytes gốc của file, để caller không phải đọc lại upload.
         """
         file_name = file.filename
         file_extension = os.path.splitext(file_name)[1].lower()
@@ -55,49 +81,74 @@ class CVProcessor:
         # Xử lý file dựa trên định dạng
         if file_extension == '.txt':
             text_content = content.decode('utf-8')
-            return file_name, file_extension[1:], text_content
+            return file_name, file_extension[1:], text_content, content
             
-        # Xử lý PDF và DOCX với temporary file
-        temp_path = None
+        # Xử lý PDF và DOCX trong process pool vì parse tốn CPU và sẽ block event loop
         try:
-            with tempfile.NamedTemporaryFile(suffix=file_extension, delete=False) as temp_file:
-                temp_file.write(content)
-                temp_path = temp_file.name
-            
             if file_extension == '.pdf':
-                with open(temp_path, 'rb') as pdf_file:
-                    extracted_text = CVProcessor._extract_from_pdf(pdf_file)
-            else:  # .docx
-                extracted_text = CVProcessor._extract_from_docx(temp_path)
-                
-            return file_name, file_extension[1:], extracted_text
+                extracted_text = await CVProcessor._extract_pdf_in_pool(content)
+            else:
+                loop = asyncio.get_running_loop()
+                extracted_text = await loop.run_in_executor(
+                    get_extraction_pool(),
+                    CVProcessor._extract_text_from_docx,
+                    content
+                )
+            return file_name, file_extension[1:], extracted_text, content
             
         except Exception as e:
             logger.error(f"Failed to process file: {str(e)}")
             raise ValueError(f"Lỗi khi xử lý file: {str(e)}")
-            
-        finally:
-            if temp_path and os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except OSError as e:
-                    logger.warning(f"Failed to remove temporary file: {str(e)}")
     
     @staticmethod
-    def _extract_from_pdf(file) -> str:
-        """Trích xuất text từ file PDF với xử lý từng trang để giảm sử dụng memory"""
-        text_parts = []
-        pdf_reader = PyPDF2.PdfReader(file)
+    async def _extract_pdf_in_pool(content: bytes) -> str:
+        """
+        Trích xuất text PDF trong process pool. PDF ngắn (dưới PARALLEL_PDF_MIN_PAGES
+        trang) được xử lý trọn trong một process; PDF dài hơn được chia thành các
+        khoảng trang và xử lý song song trên nhiều process.
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_extraction_pool()
+        page_count, text = await loop.run_in_executor(
+            pool, CVProcessor._extract_short_pdf, content
+        )
+        if text is not None:
+            return text
         
-        for page in pdf_reader.pages:
-            text_parts.append(page.extract_text())
-            
-        return "\n".join(text_parts).strip()
+        chunk_size = -(-page_count // EXTRACTION_MAX_WORKERS)
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(
+                pool, CVProcessor._extract_pdf_pages, content, start, min(start + chunk_size, page_count)
+            )
+            for start in range(0, page_count, chunk_size)
+        ])
+        return "\n".join(parts).strip()
+    
+    @staticmethod
+    def _extract_short_pdf(content: bytes) -> Tuple[int, Optional[str]]:
+        """
+        Đếm số trang PDF và trích xuất luôn toàn bộ text nếu không cần chia song song
+        (chạy trong process pool). Trả về (page_count, text) với text là None khi
+        PDF đủ dài để chia thành các khoảng trang.
+        """
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+        page_count = len(pdf_reader.pages)
+        if page_count >= PARALLEL_PDF_MIN_PAGES and EXTRACTION_MAX_WORKERS > 1:
+            return page_count, None
+        text = "\n".join(page.extract_text() for page in pdf_reader.pages).strip()
+        return page_count, text
+    
+    @staticmethod
+    def _extract_pdf_pages(content: bytes, start: int, stop: int) -> str:
+        """Trích xuất text các trang [start, stop) của PDF (chạy trong process pool)"""
+        pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
+        return "\n".join(pdf_reader.pages[i].extract_text() for i in range(start, stop))
     
     @staticmethod
-    def _extract_from_docx(file_path: str) -> str:
-        """Trích xuất text từ file DOCX"""
-        doc = docx.Document(file_path)
+    def _extract_text_from_docx(content: bytes) -> str:
+        """Trích xuất text từ nội dung file DOCX (chạy trong process pool)"""
+        # python-docx đọc được file-like object nên không cần ghi ra file tạm
+        doc = docx.Document(io.BytesIO(content))
         return "\n".join(paragraph.text for paragraph in doc.paragraphs).strip()
 
     @staticmethod
@@ -172,22 +223,22 @@ class CVProcessor:
             career_recommendations = basic_analysis_data.get("career_recommendations", [])
             
             if career_recommendations:
-                store_tasks = [
-                    store_career_pathway(
-                        pathway_id=f"career_{rec['position'].lower().replace(' ', '_')}",
-                        name=rec['position'],
-                        description=rec.get('description', ''),
-                        required_skills=rec.get('required_skills', []),
-                        reason=rec.get('reason', ''),
-                        industry=rec.get('industry', ''),
-                        required_experience=rec.get('required_experience', ''),
-                        score=rec.get('score', 0.0),
-                    )
+                pathways = [
+                    {
+                        "pathway_id": f"career_{rec['position'].lower().replace(' ', '_')}",
+                        "name": rec['position'],
+                        "description": rec.get('description', ''),
+                        "required_skills": rec.get('required_skills', []),
+                        "reason": rec.get('reason', ''),
+                        "industry": rec.get('industry', ''),
+                        "required_experience": rec.get('required_experience', ''),
+                        "score": rec.get('score', 0.0),
+                    }
                     for rec in career_recommendations
                 ]
                 
                 try:
-                    await wait_for(asyncio.gather(*store_tasks), timeout=20.0)
+                    await wait_for(store_career_pathways_bulk(pathways), timeout=20.0)
                 except TimeoutError:
                     logger.warning(f"CV {cv_id}: Timeout khi lưu career pathways")
                 except Exception as e:
@@ -211,8 +262,9 @@ class CVProcessor:
             if not career_matches:
                 career_paths = career_analysis.get("career_paths", [])[:5]
                 career_matches = [
-                    {"name": path, "score": fit_score}
-                    for path, fit_score in career_paths
+                    {"name": path.get("path"), "score": path.get("fit_score", 0.0)}
+                    for path in career_paths
+                    if isinstance(path, dict)
                 ]
 
         except Exception as e:
@@ -224,7 +276,11 @@ class CVProcessor:
     @staticmethod
     async def analyze_cv(cv_id: int, text: str) -> Dict[str, Any]:
         """Phân tích đầy đủ CV bao gồm thông tin nghề nghiệp và đề xuất"""
+        quality_task = None
         try:
+            # Đánh giá chất lượng CV không phụ thuộc các bước khác nên chạy song song
+            quality_task = asyncio.create_task(assess_cv_quality(text))
+
             # 1. Phân tích cơ bản CV
             basic_analysis = await analyze_cv_content(text)
             
@@ -234,28 +290,32 @@ class CVProcessor:
             # 2. Trích xuất skills
             all_skills = await CVProcessor._extract_skills(basic_analysis)
 
-            # 3. Tạo career profile
-            career_analysis = await analyze_career_profile(
-                skills=all_skills,
-                experiences=basic_analysis.get("experience", []),
-                education=basic_analysis.get("education", []),
-                career_goals=basic_analysis.get("career_goals", []),
-                preferred_industries=[]
-            )
-            
-            # 4. Tạo embedding cho CV
-            embedding_vector = None
-            try:
-                embedding_vector = await wait_for(
+            # 3 & 4. Tạo career profile và embedding cho CV song song vì không phụ thuộc nhau
+            career_analysis, embedding_vector = await asyncio.gather(
+                analyze_career_profile(
+                    skills=all_skills,
+                    experiences=basic_analysis.get("experience", []),
+                    education=basic_analysis.get("education", []),
+                    career_goals=basic_analysis.get("career_goals", []),
+                    preferred_industries=[]
+                ),
+                wait_for(
                     CVProcessor._create_cv_embedding_with_retry(
                         cv_id=cv_id,
                         text=text,
                         basic_analysis=basic_analysis
                     ),
                     timeout=30.0
-                )
-            except Exception as e:
-                logger.error(f"CV {cv_id}: Lỗi khi tạo embedding vector: {str(e)}")
+                ),
+                return_exceptions=True
+            )
+            
+            if isinstance(career_analysis, BaseException):
+                raise career_analysis
+            
+            if isinstance(embedding_vector, BaseException):
+                logger.error(f"CV {cv_id}: Lỗi khi tạo embedding vector: {str(embedding_vector)}")
+                embedding_vector = None
 
             # 5. Xử lý career matches
             career_matches = await CVProcessor._process_career_matches(
@@ -269,19 +329,38 @@ class CVProcessor:
             # 6. Phân tích skill gaps
             all_skill_gaps = []
             try:
-                experience_level = basic_analysis.get("analyst", {}).get("experience_level", "N/A")
-                all_skill_gaps = await identify_skill_gaps(
-                    current_skills=all_skills,
-                    target_career=career_matches,
-                    experience_level=experience_level,
+                # Chỉ gửi tên nghề và danh sách kỹ năng yêu cầu, không gửi cả list dict matches
+                # (điểm similarity, mô tả...) để prompt gọn và cache key ổn định
+                target_career = ", ".join(
+                    match["name"] for match in career_matches if match.get("name")
                 )
+                if not target_career:
+                    # Không có career matches thì dùng các career paths do AI đề xuất
+                    target_career = ", ".join(
+                        path["path"]
+                        for path in career_analysis.get("career_paths", [])[:5]
+                        if isinstance(path, dict) and path.get("path")
+                    )
+                target_skills = sorted({
+                    skill
+                    for match in career_matches
+                    for skill in match.get("required_skills") or []
+                })
+                if target_career:
+                    experience_level = basic_analysis.get("analyst", {}).get("experience_level", "N/A")
+                    all_skill_gaps = await identify_skill_gaps(
+                        current_skills=all_skills,
+                        target_career=target_career,
+                        experience_level=experience_level,
+                        target_skills=target_skills,
+                    )
             except Exception as e:
                 logger.error(f"CV {cv_id}: Lỗi khi phân tích skill gaps: {str(e)}")
             
             # 7. Đánh giá chất lượng CV
             quality_assessment = {}
             try:
-                quality_assessment = await assess_cv_quality(text)
+                quality_assessment = await quality_task
             except Exception as e:
                 logger.error(f"CV {cv_id}: Lỗi khi đánh giá chất lượng CV: {str(e)}")
 
@@ -298,6 +377,8 @@ class CVProcessor:
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Lỗi khi phân tích CV {cv_id}: {error_msg}")
+            if quality_task is not None and not quality_task.done():
+                quality_task.cancel()
             
             # Return a standardized error response
             return {
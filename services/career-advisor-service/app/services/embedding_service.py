@@ -1,10 +1,13 @@
 import logging
 import asyncio
+from collections import OrderedDict
 from functools import lru_cache
 from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional, Dict, Any, Union, Tuple
 import numpy as np
+import torch
 from sentence_transformers import SentenceTransformer
+from app.core.config import settings
 from app.services.redis_service import RedisService
 
 # Cấu hình logging
@@ -23,7 +26,12 @@ class EmbeddingService:
     # Cấu hình cache
     CACHE_EXPIRY = 86400  # 24 giờ
     CACHE_PREFIX = "embedding"
-    MAX_CACHE_KEY_LENGTH = 50
+    
+    # Số embedding giữ trong bộ nhớ process (LRU), đứng trước Redis cache
+    LOCAL_CACHE_SIZE = 1024
+    
+    # Cấu hình batch encode
+    ENCODE_BATCH_SIZE = 64
 
     @classmethod
     async def get_instance(cls) -> 'EmbeddingService':
@@ -53,7 +61,7 @@ class EmbeddingService:
                 with ThreadPoolExecutor() as executor:
                     self._model = await asyncio.get_event_loop().run_in_executor(
                         executor,
-                        lambda: SentenceTransformer('VoVanPhuc/sup-SimCSE-VietNamese-phobert-base')
+                        self._load_model
                     )
                 
             # Khởi tạo executor cho các tác vụ CPU-bound
@@ -64,6 +72,18 @@ class EmbeddingService:
             logger.error(f"Lỗi khi khởi tạo embedding model: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def _load_model() -> SentenceTransformer:
+        """
+        Tải model, giới hạn độ dài chuỗi để giảm padding và chuyển sang
+        FP16 khi chạy trên GPU
+        """
+        model = SentenceTransformer('VoVanPhuc/sup-SimCSE-VietNamese-phobert-base')
+        model.max_seq_length = settings.EMBEDDING_MAX_SEQ_LENGTH
+        if settings.EMBEDDING_USE_FP16 and torch.cuda.is_available():
+            model = model.to("cuda").half()
+        return model
+
     def __init__(self):
         """
         Khởi tạo instance với model là None, sẽ được initialize sau
@@ -74,6 +94,7 @@ class EmbeddingService:
         # Các thuộc tính sẽ được khởi tạo trong initialize()
         self._initialized = False
         self._redis_service = None
+        self._local_cache: "OrderedDict[str, List[float]]" = OrderedDict()
 
     def __del__(self):
         """
@@ -91,7 +112,7 @@ class EmbeddingService:
 
     def _generate_cache_key(self, prefix: str, text: str) -> str:
         """
-        Tạo cache key từ prefix và text
+        Tạo cache key từ prefix và hash nội dung text
         
         Args:
             prefix: Tiền tố cho cache key
@@ -100,8 +121,25 @@ class EmbeddingService:
         Returns:
             str: Cache key
         """
-        truncated_text = text[:self.MAX_CACHE_KEY_LENGTH]
-        return self.redis_service.generate_cache_key(f"{self.CACHE_PREFIX}_{prefix}", truncated_text)
+        return self.redis_service.generate_content_key(f"{self.CACHE_PREFIX}_{prefix}", text)
+
+    def _get_local_cache(self, key: str) -> Optional[List[float]]:
+        """
+        Lấy embedding từ LRU cache trong process
+        """
+        embedding = self._local_cache.get(key)
+        if embedding is not None:
+            self._local_cache.move_to_end(key)
+        return embedding
+
+    def _set_local_cache(self, key: str, embedding: List[float]) -> None:
+        """
+        Lưu embedding vào LRU cache trong process, loại bỏ phần tử cũ nhất khi đầy
+        """
+        self._local_cache[key] = embedding
+        self._local_cache.move_to_end(key)
+        if len(self._local_cache) > self.LOCAL_CACHE_SIZE:
+            self._local_cache.popitem(last=False)
 
     async def create_embedding(self, text: str) -> List[float]:
         """
@@ -121,11 +159,16 @@ class EmbeddingService:
             raise ValueError("Text không được rỗng và phải là chuỗi")
             
         try:
-            # Kiểm tra cache
-            cache_key = self._generate_cache_key("text", text[:self.MAX_CACHE_KEY_LENGTH])
+            # Kiểm tra cache trong process trước, sau đó tới Redis
+            cache_key = self._generate_cache_key("text", text)
+            cached_embedding = self._get_local_cache(cache_key)
+            if cached_embedding is not None:
+                return cached_embedding
+
             cached_embedding = await self.redis_service.get_cache(cache_key)
             
             if cached_embedding is not None:
+                self._set_local_cache(cache_key, cached_embedding)
                 return cached_embedding
 
             # Tạo embedding trong executor để không block event loop
@@ -136,6 +179,7 @@ class EmbeddingService:
             )
             
             # Cache kết quả
+            self._set_local_cache(cache_key, embedding)
             await self.redis_service.set_cache(
                 cache_key, 
                 embedding, 
@@ -159,7 +203,9 @@ class EmbeddingService:
             List[float]: Vector embedding đã chuẩn hóa
         """
         # Tạo embedding
-        embedding = self._model.encode(text)
+        with torch.inference_mode():
+            embedding = self._model.encode(text, convert_to_numpy=True)
+        embedding = embedding.astype(np.float32, copy=False)
         
         # Chuẩn hóa vector (L2 normalization)
         norm = np.linalg.norm(embedding)
@@ -197,8 +243,12 @@ class EmbeddingService:
                     results[i] = []  # Trả về vector rỗng cho text không hợp lệ
                     continue
                     
-                cache_key = self._generate_cache_key("text", text[:self.MAX_CACHE_KEY_LENGTH])
-                cached_embedding = await self.redis_service.get_cache(cache_key)
+                cache_key = self._generate_cache_key("text", text)
+                cached_embedding = self._get_local_cache(cache_key)
+                if cached_embedding is None:
+                    cached_embedding = await self.redis_service.get_cache(cache_key)
+                    if cached_embedding:
+                        self._set_local_cache(cache_key, cached_embedding)
                 
                 if cached_embedding:
                     results[i] = cached_embedding
@@ -217,7 +267,8 @@ class EmbeddingService:
                     results[idx] = embedding
                     
                     # Tạo task cache nhưng không đợi hoàn thành ngay
-                    cache_key = self._generate_cache_key("text", texts[idx][:self.MAX_CACHE_KEY_LENGTH])
+                    cache_key = self._generate_cache_key("text", texts[idx])
+                    self._set_local_cache(cache_key, embedding)
                     cache_tasks.append(
                         self.redis_service.set_cache(cache_key, embedding, expiry=self.CACHE_EXPIRY)
                     )
@@ -244,7 +295,15 @@ class EmbeddingService:
         """
         # Thực hiện batch encode trong executor
         def batch_encode():
-            embeddings = self._model.encode(texts)
+            # encode() tự sắp xếp text theo độ dài để giảm padding và trả về đúng thứ tự ban đầu
+            with torch.inference_mode():
+                embeddings = self._model.encode(
+                    texts,
+                    batch_size=self.ENCODE_BATCH_SIZE,
+                    show_progress_bar=False,
+                    convert_to_numpy=True
+                )
+            embeddings = embeddings.astype(np.float32, copy=False)
             # Chuẩn hóa từng vector
             norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
             # Tránh chia cho 0
@@ -305,17 +364,12 @@ class EmbeddingService:
             raise ValueError("Cả hai embedding vectors đều cần được cung cấp")
             
         try:
-            # Tính toán trong executor để tránh blocking
-            def compute_similarity():
-                vec1 = np.array(embedding1)
-                vec2 = np.array(embedding2)
-                # Clip để đảm bảo giá trị nằm trong khoảng [0, 1]
-                similarity = float(np.clip(np.dot(vec1, vec2), 0.0, 1.0))
-                return similarity
-                
-            return await asyncio.get_event_loop().run_in_executor(
-                self._executor, compute_similarity
-            )
+            # Các vector đã được chuẩn hóa L2 nên cosine chính là dot product.
+            # Một phép dot trên vài trăm chiều rẻ hơn chi phí chuyển sang executor
+            vec1 = np.asarray(embedding1, dtype=np.float32)
+            vec2 = np.asarray(embedding2, dtype=np.float32)
+            # Clip để đảm bảo giá trị nằm trong khoảng [0, 1]
+            return float(np.clip(np.dot(vec1, vec2), 0.0, 1.0))
             
         except Exception as e:
             logger.error(f"Lỗi khi tính similarity: {str(e)}", exc_info=True)
@@ -352,8 +406,8 @@ class EmbeddingService:
         try:
             # Tính toán song song
             def compute_bulk_similarities():
-                query_vec = np.array(query_embedding)
-                target_vecs = np.array(target_embeddings)
+                query_vec = np.asarray(query_embedding, dtype=np.float32)
+                target_vecs = np.asarray(target_embeddings, dtype=np.float32)
                 
                 # Tính dot product một lần cho tất cả
                 similarities = np.dot(target_vecs, query_vec)
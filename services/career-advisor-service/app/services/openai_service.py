@@ -1,10 +1,11 @@
-import json
 import logging
+import re
 import asyncio
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from functools import wraps
 
-from openai import OpenAI
+import orjson
+from openai import AsyncOpenAI
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 
 from app.core.config import settings
@@ -14,8 +15,8 @@ from app.services.redis_service import RedisService
 # Cấu hình logging
 logger = logging.getLogger(__name__)
 
-# Khởi tạo OpenAI client với OpenRouter
-client = OpenAI(
+# Khởi tạo OpenAI client (async) với OpenRouter, dùng chung connection pool cho cả app
+client = AsyncOpenAI(
     base_url="https://openrouter.ai/api/v1",
     api_key=settings.OPENROUTER_API_KEY,
 )
@@ -26,6 +27,70 @@ extra_headers = {
     "X-Title": settings.SITE_NAME,
 }
 
+# System prompts dùng chung, giữ nguyên từng byte giữa các request để
+# provider có thể tái sử dụng prompt cache
+_SYS_CAREER_ADVISOR = "Bạn là AI Career Advisor, một hệ thống tư vấn nghề nghiệp bằng AI. Bạn phân tích dữ liệu và đưa ra khuyến nghị."
+_SYS_CV_ANALYZER = "Bạn là AI CV Analyzer, một hệ thống phân tích CV chuyên nghiệp. Bạn phân tích kỹ lưỡng và đưa ra nhận xét chi tiết về CV."
+_SYS_CV_QUALITY = "Bạn là AI CV Quality Assessor, một hệ thống đánh giá chất lượng CV chuyên nghiệp."
+
+# Thời gian cache kết quả chat completion (giây)
+COMPLETION_CACHE_EXPIRY = 86400
+
+# Giới hạn số request đồng thời tới OpenRouter để tránh vượt rate limit
+_completion_semaphore = asyncio.Semaphore(settings.OPENAI_CONCURRENCY)
+
+
+async def _create_chat_completion(**kwargs):
+    """
+    Gọi chat completion bằng async client, cho phép nhiều request chạy
+    song song (tối đa OPENAI_CONCURRENCY) mà không cần thread riêng.
+    """
+    async with _completion_semaphore:
+        return await client.chat.completions.create(
+            extra_headers=extra_headers,
+            model=settings.AI_MODEL,
+            **kwargs
+        )
+
+
+async def close_client() -> None:
+    """
+    Đóng OpenAI client khi shutdown ứng dụng.
+    """
+    await client.close()
+
+def _to_prompt_json(data: Any) -> str:
+    """
+    Serialize dữ liệu đưa vào prompt dưới dạng JSON gọn và ổn định
+    (không khoảng trắng thừa, key được sắp xếp) để giảm số token.
+    """
+    return orjson.dumps(data, option=orjson.OPT_SORT_KEYS).decode()
+
+
+def _completion_cache_key(prefix: str, messages: List[Dict[str, str]]) -> str:
+    """
+    Tạo cache key từ model và toàn bộ nội dung messages gửi tới AI.
+    """
+    payload = orjson.dumps(
+        {"model": settings.AI_MODEL, "messages": messages},
+        option=orjson.OPT_SORT_KEYS
+    ).decode()
+    return RedisService.get_instance().generate_content_key(prefix, payload)
+
+# Markdown code fence (```json ... ```) bao quanh JSON trong phản hồi của AI
+_FENCE_RE = re.compile(r"^```(?:json)?\s*(.*?)\s*(?:```|$)", re.DOTALL)
+
+
+def _parse_json_response(result_text: str) -> Any:
+    """
+    Bỏ markdown code fence (nếu có) khỏi phản hồi của AI và parse JSON.
+    Raise orjson.JSONDecodeError nếu nội dung không phải JSON hợp lệ.
+    """
+    match = _FENCE_RE.match(result_text)
+    if match:
+        result_text = match.group(1)
+    return orjson.loads(result_text)
+
 # Hàm để tạo embeddings
 
 
@@ -56,28 +121,30 @@ async def create_embedding(text: str) -> List[float]:
         List[float]: Vector embedding.
     """
     try:
-        # Kiểm tra cache
-        redis_service = RedisService.get_instance()
-        cache_key = redis_service.generate_cache_key("embedding", text[:50])
-        cached_embedding = await redis_service.get_cache(cache_key)
+        # EmbeddingService đã cache (LRU trong process + Redis) theo hash nội dung
+        embedding_service = await EmbeddingService.get_instance()
+        return await embedding_service.create_embedding(text)
+    except Exception as e:
+        logger.error(f"Lỗi khi tạo embedding: {str(e)}", exc_info=True)
+        raise
 
-        if cached_embedding:
-            logger.info(f"Sử dụng embedding từ cache cho: {text[:50]}...")
-            return cached_embedding
 
-        try:
-            # Tạo embedding với sentence-transformers
-            embedding_service = await EmbeddingService.get_instance()
-            embedding = await embedding_service.create_embedding(text)
+@retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(3))
+async def create_embeddings(texts: List[str]) -> List[List[float]]:
+    """
+    Tạo embedding cho nhiều văn bản trong một lần encode theo batch.
 
-            await redis_service.set_cache(cache_key, embedding, expiry=86400)
-            return embedding
+    Args:
+        texts: Danh sách văn bản đầu vào.
 
-        except Exception as e:
-            logger.error(f"Lỗi khi tạo hoặc cache embedding: {str(e)}")
-            raise
+    Returns:
+        List[List[float]]: Danh sách vector embedding theo đúng thứ tự đầu vào.
+    """
+    try:
+        embedding_service = await EmbeddingService.get_instance()
+        return await embedding_service.create_embeddings(texts)
     except Exception as e:
-        logger.error(f"Lỗi khi tạo embedding: {str(e)}", exc_info=True)
+        logger.error(f"Lỗi khi tạo embeddings: {str(e)}", exc_info=True)
         raise
 
 # Hàm để phân tích hồ sơ nghề nghiệp
@@ -121,7 +188,7 @@ async def analyze_career_profile(
         Hãy phân tích hồ sơ nghề nghiệp dưới đây và đưa ra các gợi ý phát triển.
         
         Hồ sơ nghề nghiệp:
-        {json.dumps(profile_data, ensure_ascii=False)}
+        {_to_prompt_json(profile_data)}
         
         Yêu cầu:
         1. Phân tích điểm mạnh và điểm yếu dựa trên thông tin được cung cấp.
@@ -156,14 +223,14 @@ async def analyze_career_profile(
         Đảm bảo phản hồi của bạn chỉ chứa JSON hợp lệ, không có văn bản giới thiệu hoặc giải thích.
         """
 
-        # Kiểm tra cache
+        messages = [
+            {"role": "system", "content": _SYS_CAREER_ADVISOR},
+            {"role": "user", "content": prompt}
+        ]
+
+        # Kiểm tra cache theo nội dung prompt
         redis_service = RedisService.get_instance()
-        cache_key = redis_service.generate_cache_key(
-            "career_analysis",
-            "_".join(skills[:3]),  # Sử dụng 3 kỹ năng đầu tiên làm key
-            "_".join(str(exp['position'])
-                     for exp in experiences[:2])  # 2 kinh nghiệm đầu
-        )
+        cache_key = _completion_cache_key("career_analysis", messages)
         cached_result = await redis_service.get_cache(cache_key)
 
         if cached_result:
@@ -174,13 +241,8 @@ async def analyze_career_profile(
             f"Gửi request đến OpenAI API với model {settings.AI_MODEL}")
         start_time = asyncio.get_event_loop().time()
         # Gọi API nếu không có trong cache
-        response = client.chat.completions.create(
-            extra_headers=extra_headers,
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": "Bạn là AI Career Advisor, một hệ thống tư vấn nghề nghiệp bằng AI. Bạn phân tích dữ liệu và đưa ra khuyến nghị."},
-                {"role": "user", "content": prompt}
-            ],
+        response = await _create_chat_completion(
+            messages=messages,
             temperature=0.3,
             max_tokens=2000
         )
@@ -192,17 +254,7 @@ async def analyze_career_profile(
 
         # Chuyển đổi phản hồi thành JSON
         try:
-            # Xử lý kết quả để đảm bảo chỉ lấy phần JSON
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-
-            result_data = json.loads(result_text.strip())
+            result_data = _parse_json_response(result_text)
 
             # Đảm bảo các trường quan trọng luôn tồn tại với giá trị mặc định
             default_data = {
@@ -238,8 +290,9 @@ async def analyze_career_profile(
                         })
                 result_data["career_paths"] = career_paths
 
+            await redis_service.set_cache(cache_key, result_data, expiry=COMPLETION_CACHE_EXPIRY)
             return result_data
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Lỗi xử lý JSON: {str(e)}")
             logger.error(f"Dữ liệu nhận được: {result_text}")
             raise Exception(
@@ -345,18 +398,27 @@ async def analyze_cv_content(cv_text: str) -> Dict[str, Any]:
         
         Đảm bảo phản hồi của bạn chỉ chứa JSON hợp lệ, không có văn bản giới thiệu hoặc giải thích.
         """
+        messages = [
+            {"role": "system", "content": _SYS_CV_ANALYZER},
+            {"role": "user", "content": prompt}
+        ]
+
+        # Kiểm tra cache theo nội dung prompt
+        redis_service = RedisService.get_instance()
+        cache_key = _completion_cache_key("cv_analysis", messages)
+        cached_result = await redis_service.get_cache(cache_key)
+
+        if cached_result:
+            logger.info(f"Sử dụng kết quả phân tích CV từ cache: {cache_key}")
+            return cached_result
+
         # Gọi API
         logger.info(
             f"Gửi request đến OpenAI API với model {settings.AI_MODEL}")
         start_time = asyncio.get_event_loop().time()
         try:
-            response = client.chat.completions.create(
-                extra_headers=extra_headers,
-                model=settings.AI_MODEL,
-                messages=[
-                    {"role": "system", "content": "Bạn là AI CV Analyzer, một hệ thống phân tích CV chuyên nghiệp. Bạn phân tích kỹ lưỡng và đưa ra nhận xét chi tiết về CV."},
-                    {"role": "user", "content": prompt}
-                ],
+            response = await _create_chat_completion(
+                messages=messages,
                 temperature=0.3,
                 max_tokens=2500
             )
@@ -378,24 +440,12 @@ async def analyze_cv_content(cv_text: str) -> Dict[str, Any]:
             raise
 
         try:
-            # Clean và validate response text
-            if result_text.startswith("```json"):
-                logger.debug("Phát hiện markdown JSON block")
-                result_text = result_text.replace("```json", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-            elif result_text.startswith("```"):
-                logger.debug("Phát hiện markdown block")
-                result_text = result_text.replace("```", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-
-            result_text = result_text.strip()
+            # Validate response text
             if not result_text:
                 logger.error("Response text rỗng sau khi xử lý")
                 raise Exception("Response text không hợp lệ")
 
-            result_data = json.loads(result_text)
+            result_data = _parse_json_response(result_text)
             logger.debug(
                 f"JSON parsed successfully với {len(result_data)} fields")
 
@@ -437,9 +487,11 @@ async def analyze_cv_content(cv_text: str) -> Dict[str, Any]:
                 for skill_type in ["technical", "soft", "languages"]:
                     if skill_type not in result_data["skills"]:
                         result_data["skills"][skill_type] = []
+
+            await redis_service.set_cache(cache_key, result_data, expiry=COMPLETION_CACHE_EXPIRY)
             return result_data
 
-        except json.JSONDecodeError as json_err:
+        except orjson.JSONDecodeError as json_err:
             logger.error(
                 f"Lỗi parse JSON tại vị trí {json_err.pos}: {json_err.msg}")
             logger.error(
@@ -453,7 +505,7 @@ async def analyze_cv_content(cv_text: str) -> Dict[str, Any]:
         logger.error("Timeout khi phân tích CV", exc_info=True)
         raise Exception("Quá thời gian chờ phản hồi từ API. Vui lòng thử lại.")
 
-    except json.JSONDecodeError as e:
+    except orjson.JSONDecodeError as e:
         logger.error(f"Lỗi xử lý JSON tại vị trí {e.pos}: {e.msg}")
         logger.error(
             f"Context xung quanh lỗi: ...{result_text[max(0, e.pos-100):e.pos]}>>>HERE<<<{result_text[e.pos:e.pos+100]}...")
@@ -477,7 +529,8 @@ async def analyze_cv_content(cv_text: str) -> Dict[str, Any]:
 async def identify_skill_gaps(
     current_skills: List[str],
     target_career: str,
-    experience_level: str = "entry"  # entry, mid, senior
+    experience_level: str = "entry",  # entry, mid, senior
+    target_skills: Optional[List[str]] = None
 ) -> Dict[str, Any]:
     """
     Xác định khoảng cách kỹ năng giữa các kỹ năng hiện tại và các kỹ năng cần thiết cho nghề nghiệp mục tiêu.
@@ -486,21 +539,27 @@ async def identify_skill_gaps(
         current_skills: Danh sách kỹ năng hiện tại.
         target_career: Nghề nghiệp mục tiêu.
         experience_level: Cấp độ kinh nghiệm mong muốn.
+        target_skills: Kỹ năng yêu cầu đã biết của vị trí mục tiêu (ví dụ lấy từ Pinecone),
+            giúp AI so khớp trực tiếp thay vì tự suy ra.
 
     Returns:
         Dict[str, Any]: Kết quả phân tích khoảng cách kỹ năng.
     """
     try:
+        required_skills_section = ""
+        if target_skills:
+            required_skills_section = f"Kỹ năng yêu cầu của vị trí mục tiêu: {_to_prompt_json(target_skills)}\n"
+
         # Tạo prompt
         prompt = f"""
         Xác định khoảng cách kỹ năng giữa kỹ năng hiện tại của người dùng và các kỹ năng cần thiết cho vị trí {target_career} ở cấp độ {experience_level}.
         
         Kỹ năng hiện tại:
-        {json.dumps(current_skills, ensure_ascii=False)}
+        {_to_prompt_json(current_skills)}
         
         Vị trí mục tiêu: {target_career}
         Cấp độ kinh nghiệm: {experience_level}
-        
+        {required_skills_section}
         Hãy xác định:
         1. Các kỹ năng thiếu cho vị trí này
         2. Mức độ quan trọng của từng kỹ năng (Cao, Trung bình, Thấp)
@@ -523,16 +582,25 @@ async def identify_skill_gaps(
         
         Đảm bảo phản hồi của bạn chỉ chứa JSON hợp lệ, không có văn bản giới thiệu hoặc giải thích.
         """
+        messages = [
+            {"role": "system", "content": _SYS_CAREER_ADVISOR},
+            {"role": "user", "content": prompt}
+        ]
+
+        # Kiểm tra cache theo nội dung prompt
+        redis_service = RedisService.get_instance()
+        cache_key = _completion_cache_key("skill_gaps", messages)
+        cached_result = await redis_service.get_cache(cache_key)
+
+        if cached_result:
+            logger.info(f"Sử dụng kết quả skill gaps từ cache: {cache_key}")
+            return cached_result
+
         logger.info(f"Gửi request đến OpenAI API với model {settings.AI_MODEL}")
         start_time = asyncio.get_event_loop().time()
         # Gọi API
-        response = client.chat.completions.create(
-            extra_headers=extra_headers,
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": "Bạn là AI Career Advisor, một hệ thống tư vấn nghề nghiệp bằng AI. Bạn phân tích dữ liệu và đưa ra khuyến nghị."},
-                {"role": "user", "content": prompt}
-            ],
+        response = await _create_chat_completion(
+            messages=messages,
             temperature=0.3,
             max_tokens=1500
         )
@@ -543,19 +611,10 @@ async def identify_skill_gaps(
 
         # Chuyển đổi phản hồi thành JSON
         try:
-            # Xử lý kết quả để đảm bảo chỉ lấy phần JSON
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-
-            result_data = json.loads(result_text.strip())
+            result_data = _parse_json_response(result_text)
+            await redis_service.set_cache(cache_key, result_data, expiry=COMPLETION_CACHE_EXPIRY)
             return result_data
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Lỗi xử lý JSON: {str(e)}")
             logger.error(f"Dữ liệu nhận được: {result_text}")
             raise Exception(
@@ -656,16 +715,25 @@ async def assess_cv_quality(cv_text: str) -> Dict[str, Any]:
 
         Đảm bảo phản hồi của bạn chỉ chứa JSON hợp lệ, không có văn bản giới thiệu hoặc giải thích.
         """
+        messages = [
+            {"role": "system", "content": _SYS_CV_QUALITY},
+            {"role": "user", "content": prompt}
+        ]
+
+        # Kiểm tra cache theo nội dung prompt
+        redis_service = RedisService.get_instance()
+        cache_key = _completion_cache_key("cv_quality", messages)
+        cached_result = await redis_service.get_cache(cache_key)
+
+        if cached_result:
+            logger.info(f"Sử dụng kết quả đánh giá CV từ cache: {cache_key}")
+            return cached_result
+
         logger.info(f"Gửi request đến OpenAI API với model {settings.AI_MODEL}")
         start_time = asyncio.get_event_loop().time()
         # Gọi API
-        response = client.chat.completions.create(
-            extra_headers=extra_headers,
-            model=settings.AI_MODEL,
-            messages=[
-                {"role": "system", "content": "Bạn là AI CV Quality Assessor, một hệ thống đánh giá chất lượng CV chuyên nghiệp."},
-                {"role": "user", "content": prompt}
-            ],
+        response = await _create_chat_completion(
+            messages=messages,
             temperature=0.3,
             max_tokens=2000
         )
@@ -675,16 +743,7 @@ async def assess_cv_quality(cv_text: str) -> Dict[str, Any]:
         result_text = response.choices[0].message.content.strip()
         # Chuyển đổi phản hồi thành JSON
         try:
-            if result_text.startswith("```json"):
-                result_text = result_text.replace("```json", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-            elif result_text.startswith("```"):
-                result_text = result_text.replace("```", "", 1)
-                if "```" in result_text:
-                    result_text = result_text.split("```")[0]
-
-            result_data = json.loads(result_text.strip())
+            result_data = _parse_json_response(result_text)
 
             # Đảm bảo các trường quan trọng luôn tồn tại với giá trị mặc định
             default_data = {
@@ -750,9 +809,10 @@ async def assess_cv_quality(cv_text: str) -> Dict[str, Any]:
                 return result
 
             result_data = merge_dict(default_data, result_data)
+            await redis_service.set_cache(cache_key, result_data, expiry=COMPLETION_CACHE_EXPIRY)
             return result_data
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Lỗi xử lý JSON: {str(e)}")
             logger.error(f"Dữ liệu nhận được: {result_text}")
             raise Exception(
@@ -1,12 +1,14 @@
-import json
+import asyncio
 import logging
+import threading
+import orjson
 from typing import Any, Dict, List, Optional
 
 from pinecone import Pinecone, ServerlessSpec
 from tenacity import retry, stop_after_attempt, wait_random_exponential
 from app.core.config import settings
 from app.services.redis_service import RedisService
-from app.services.openai_service import create_embedding
+from app.services.openai_service import create_embedding, create_embeddings
 
 
 # Cấu hình logging
@@ -15,11 +17,16 @@ logger = logging.getLogger(__name__)
 class PineconeClient:
     _instance = None
     _index = None
+    # Khóa để chỉ khởi tạo client/index một lần khi nhiều thread cùng gọi
+    # (warm-up lúc startup chạy trong thread riêng)
+    _lock = threading.Lock()
 
     @classmethod
     def get_instance(cls):
         if cls._instance is None:
-            cls._instance = cls()
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls()
         return cls._instance
 
     def __init__(self):
@@ -61,11 +68,48 @@ class PineconeClient:
         Lấy Pinecone index đã được khởi tạo.
         """
         if self._index is None:
-            self.init_pinecone()
+            with PineconeClient._lock:
+                if self._index is None:
+                    self.init_pinecone()
         return self._index
 
+# Số vector tối đa trong một request upsert của Pinecone
+UPSERT_BATCH_SIZE = 100
+
+# Thời gian giữ hash nội dung pathway đã upsert (giây); hết hạn thì upsert lại
+PATHWAY_HASH_EXPIRY = 86400
+
+
+def _build_pathway_text(name: str, description: str, required_skills: List[str], reason: str = "") -> str:
+    """
+    Tạo text dùng để embedding cho career pathway.
+    """
+    return f"{name}. {description}. Required skills: {', '.join(required_skills)}. {reason}"
+
+
+def _build_pathway_metadata(
+    name: str,
+    description: str,
+    required_skills: List[str],
+    reason: str = "",
+    industry: str = "",
+    required_experience: int = 0,
+    score: float = 0.8
+) -> Dict[str, Any]:
+    """
+    Tạo metadata lưu kèm vector career pathway.
+    """
+    return {
+        "name": name,
+        "description": description,
+        "required_skills": orjson.dumps(required_skills).decode(),
+        "reason": reason,
+        "industry": industry,
+        "required_experience": required_experience,
+        "score": score
+    }
+
 # Lưu career pathway vào Pinecone
-@retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(3))
 async def store_career_pathway(
     pathway_id: str,
     name: str,
@@ -77,66 +121,122 @@ async def store_career_pathway(
     score: float = 0.8
 ) -> bool:
     """
-    Lưu thông tin career pathway vào Pinecone.
+    Lưu thông tin một career pathway vào Pinecone (dùng chung luồng với
+    store_career_pathways_bulk).
     
     Args:
         pathway_id: ID của career pathway.
         name: Tên của career pathway.
         description: Mô tả của career pathway.
-        industry: Ngành công nghiệp.
         required_skills: Các kỹ năng yêu cầu.
+        reason: Lý do đề xuất.
+        industry: Ngành công nghiệp.
         required_experience: Kinh nghiệm yêu cầu (năm).
-        salary_range_min: Lương tối thiểu.
-        salary_range_max: Lương tối đa.
-        growth_potential: Tiềm năng phát triển (1-10).
+        score: Điểm phù hợp.
         
     Returns:
         bool: Trạng thái thành công.
     """
-    try:
-        # Tạo text để embedding
-        # Tạo embedding vector
-        text_to_embed = f"{name}. {description}. Required skills: {', '.join(required_skills)}. {reason}"
-        try:
-            embedding = await create_embedding(text_to_embed)
-            if isinstance(embedding, list):
-                logger.info(f"Tạo embedding vector thành công cho {name}")
-            else:
-                logger.error(f"Embedding vector không đúng định dạng cho {name}")
-                raise ValueError("Embedding vector phải là list")
-        except Exception as e:
-            logger.error(f"Lỗi khi tạo embedding cho {name}: {str(e)}")
-            raise
-        
-        # Chuẩn bị metadata
-        metadata = {
-            "name": name,
-            "description": description,
-            "required_skills": json.dumps(required_skills),
-            "reason": reason,
-            "industry": industry,
-            "required_experience": required_experience,
-            "score": score
-        }
-        
-        # Lấy Pinecone index từ singleton
-        index = PineconeClient.get_instance().get_index()
+    return await store_career_pathways_bulk([{
+        "pathway_id": pathway_id,
+        "name": name,
+        "description": description,
+        "required_skills": required_skills,
+        "reason": reason,
+        "industry": industry,
+        "required_experience": required_experience,
+        "score": score,
+    }])
+
+# Lưu nhiều career pathway vào Pinecone
+@retry(wait=wait_random_exponential(min=1, max=60), stop=stop_after_attempt(3))
+async def store_career_pathways_bulk(pathways: List[Dict[str, Any]]) -> bool:
+    """
+    Lưu nhiều career pathway vào Pinecone: tạo embedding theo batch và upsert
+    theo lô (tối đa UPSERT_BATCH_SIZE vector mỗi request) thay vì từng vector.
+    
+    Args:
+        pathways: Danh sách dict gồm pathway_id, name, description, required_skills
+            và các trường tùy chọn reason, industry, required_experience, score.
         
-        # Upsert vector vào Pinecone
-        index.upsert(
-            vectors=[
-                {
-                    "id": pathway_id,
-                    "values": embedding,
-                    "metadata": metadata
-                }
-            ],
-            namespace="career_pathways"
+    Returns:
+        bool: Trạng thái thành công.
+    """
+    if not pathways:
+        return True
+
+    try:
+        texts = [
+            _build_pathway_text(
+                p["name"], p.get("description", ""), p.get("required_skills", []), p.get("reason", "")
+            )
+            for p in pathways
+        ]
+        metadatas = [
+            _build_pathway_metadata(
+                p["name"],
+                p.get("description", ""),
+                p.get("required_skills", []),
+                p.get("reason", ""),
+                p.get("industry", ""),
+                p.get("required_experience", 0),
+                p.get("score", 0.8),
+            )
+            for p in pathways
+        ]
+
+        # Bỏ qua các pathway có nội dung không đổi so với lần upsert trước
+        redis_service = RedisService.get_instance()
+        hash_keys = [
+            redis_service.generate_cache_key("pathway_hash", p["pathway_id"])
+            for p in pathways
+        ]
+        content_hashes = [
+            redis_service.generate_content_key(
+                "pathway",
+                orjson.dumps({"text": text, "metadata": metadata}, option=orjson.OPT_SORT_KEYS).decode()
+            )
+            for text, metadata in zip(texts, metadatas)
+        ]
+        stored_hashes = await asyncio.gather(
+            *[redis_service.get_cache(key) for key in hash_keys]
         )
-        
+        changed = [
+            i for i, (stored, current) in enumerate(zip(stored_hashes, content_hashes))
+            if stored != current
+        ]
+        if not changed:
+            logger.info(f"{len(pathways)} career pathways không thay đổi, bỏ qua upsert")
+            return True
+
+        embeddings = await create_embeddings([texts[i] for i in changed])
+
+        vectors = [
+            {
+                "id": pathways[i]["pathway_id"],
+                "values": embedding,
+                "metadata": metadatas[i],
+            }
+            for i, embedding in zip(changed, embeddings)
+        ]
+
+        index = PineconeClient.get_instance().get_index()
+        for start in range(0, len(vectors), UPSERT_BATCH_SIZE):
+            await asyncio.to_thread(
+                index.upsert,
+                vectors=vectors[start:start + UPSERT_BATCH_SIZE],
+                namespace="career_pathways"
+            )
+
+        await asyncio.gather(*[
+            redis_service.set_cache(hash_keys[i], content_hashes[i], expiry=PATHWAY_HASH_EXPIRY)
+            for i in changed
+        ])
+
+        logger.info(f"Đã lưu {len(vectors)}/{len(pathways)} career pathways vào Pinecone")
         return True
     except Exception as e:
-        logger.error(f"Lỗi khi lưu career pathway vào Pinecone: {str(e)}")
+        logger.error(f"Lỗi khi lưu career pathways vào Pinecone: {str(e)}")
         raise
 
 # Tìm kiếm career pathway phù hợp
@@ -161,37 +261,48 @@ async def search_career_pathways(
         List[Dict[str, Any]]: Danh sách các career pathway phù hợp.
     """
     try:
-        # Sử dụng embedding_vector nếu được cung cấp, nếu không tạo mới từ query
-        query_embedding = embedding_vector
-        if query_embedding is None and query:
-            query_embedding = await create_embedding(query)
-        
-        if query_embedding is None:
+        if embedding_vector is None and not query:
             raise ValueError("Cần cung cấp embedding_vector hoặc query không rỗng")
 
-        # Tạo bộ lọc nếu cần
-        filter_dict = {}
-        if industries:
-            filter_dict["industry"] = {"$in": industries}
-            
-        # Kiểm tra cache
+        # Kiểm tra cache trước khi tạo embedding. Key gồm toàn bộ tham số ảnh hưởng
+        # kết quả (query/embedding, skills, industries, top_k) để các tìm kiếm chỉ
+        # bằng embedding không bị trùng key với nhau
         redis_service = RedisService.get_instance()
-        cache_key = redis_service.generate_cache_key(
+        cache_key = redis_service.generate_content_key(
             "career_search",
-            query[:50],
-            "_".join(industries) if industries else "all"
+            orjson.dumps(
+                {
+                    "query": query,
+                    "embedding": embedding_vector,
+                    "skills": sorted(skills) if skills else [],
+                    "industries": sorted(industries) if industries else [],
+                    "top_k": top_k,
+                },
+                option=orjson.OPT_SORT_KEYS,
+            ).decode()
         )
         cached_results = await redis_service.get_cache(cache_key)
         
         if cached_results:
             return cached_results
 
+        # Sử dụng embedding_vector nếu được cung cấp, nếu không tạo mới từ query
+        query_embedding = embedding_vector
+        if query_embedding is None:
+            query_embedding = await create_embedding(query)
+
+        # Tạo bộ lọc nếu cần
+        filter_dict = {}
+        if industries:
+            filter_dict["industry"] = {"$in": industries}
+
         # Kết nối đến Pinecone nếu không có trong cache
         index = PineconeClient.get_instance().get_index()
         
         # Thực hiện tìm kiếm
         try:
-            results = index.query(
+            results = await asyncio.to_thread(
+                index.query,
                 vector=query_embedding,
                 top_k=top_k,
                 namespace="career_pathways",
@@ -203,16 +314,17 @@ async def search_career_pathways(
             raise
         # Xử lý kết quả
         pathways = []
+        skills_set = frozenset(skills) if skills else None
         
         for i, match in enumerate(results.matches):
             # Parse required_skills từ JSON string
-            required_skills = json.loads(match.metadata.get("required_skills", "[]"))
+            required_skills = orjson.loads(match.metadata.get("required_skills", "[]"))
             logger.debug(f"Career pathway {i+1}: {match.metadata.get('name')} - Score: {match.score}")
             
             # Tính điểm phù hợp kỹ năng nếu có
             skill_match_score = 0
-            if skills:
-                matching_skills = set(skills) & set(required_skills)
+            if skills_set:
+                matching_skills = skills_set.intersection(required_skills)
                 skill_match_score = len(matching_skills) / len(required_skills) if required_skills else 0
                 logger.debug(f"Skill match score cho {match.metadata.get('name')}: {skill_match_score}")
             
@@ -1,6 +1,7 @@
-import json
+import hashlib
 import logging
 import asyncio
+import orjson
 from typing import Any, Optional
 from redis.asyncio import Redis, ConnectionPool
 from app.core.config import settings
@@ -62,7 +63,7 @@ class RedisService:
         """
         try:
             logger.debug(f"Đang lưu cache với key: {key}, expiry: {expiry}s")
-            json_value = json.dumps(value)
+            json_value = orjson.dumps(value)
             result = await asyncio.wait_for(
                 self.redis_client.setex(key, expiry, json_value),
                 timeout=5.0
@@ -95,13 +96,13 @@ class RedisService:
             )
             if value:
                 logger.info(f"Đã tìm thấy cache cho key: {key}")
-                return json.loads(value)
+                return orjson.loads(value)
             logger.info(f"Không tìm thấy cache cho key: {key}")
             return None
         except asyncio.TimeoutError:
             logger.error(f"Timeout khi lấy cache key {key}")
             return None
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Lỗi JSON khi giải mã cache cho key {key}: {str(e)}")
             await self.delete_cache(key)
             return None
@@ -153,6 +154,14 @@ class RedisService:
         """
         return f"{prefix}:{':'.join(str(arg) for arg in args)}"
 
+    def generate_content_key(self, prefix: str, content: str) -> str:
+        """
+        Tạo cache key từ hash của toàn bộ nội dung, tránh trùng key khi
+        hai nội dung dài chỉ giống nhau ở phần đầu.
+        """
+        digest = hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+        return f"{prefix}:{digest}"
+
     async def close(self):
         """
         Đóng kết nối Redis khi shutdown